@@ -1,4 +1,4 @@
-from src.app import app
+from src.app import get_app
 
 if __name__ == "__main__":
-    app.run()
+    get_app().run()
@@ -1,32 +1,73 @@
 from __future__ import annotations
 
+import hashlib
 import os
 from datetime import datetime
-from functools import wraps
-from typing import Any, Callable
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import Any, Callable, Iterator
 
 from dotenv import load_dotenv
-from flask import Flask, flash, jsonify, redirect, render_template, request, session, url_for
+from flask import (
+    Flask,
+    Response,
+    current_app,
+    flash,
+    g,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from flask_caching import Cache
+import orjson
 
 from src.storage import (
+    attendee_item,
+    attendee_limit,
     create_event,
     delete_event,
     get_attendance_for_user,
     get_event_by_slug,
     get_user_by_email,
     get_user_by_id,
+    iter_visible_attendees,
     list_visible_attendees,
+    read_versioned_data,
     search_events,
     update_event,
     upsert_attendance,
 )
 
+API_MAX_AGE = 30
+VIEW_CACHE_TIMEOUT = 30
+
+cache = Cache()
+
+
+def data_snapshot() -> dict[str, Any]:
+    # One view of the data file per request so helpers called from the same
+    # view don't each re-check the read cache. Write paths read fresh.
+    if "data" not in g:
+        g.data, g.data_version = read_versioned_data()
+    return g.data
+
+
+def snapshot_version() -> str:
+    # Version token of the request's snapshot, not of whatever is cached now.
+    data_snapshot()
+    return g.data_version
+
 
 def current_user() -> dict[str, Any] | None:
+    # Resolved once per request; views, decorators and the context processor all ask for it.
+    if "user" in g:
+        return g.user
     user_id = session.get("user_id")
-    if not user_id:
-        return None
-    return get_user_by_id(str(user_id))
+    g.user = get_user_by_id(str(user_id), data=data_snapshot()) if user_id else None
+    return g.user
 
 
 def login_required(view: Callable[..., Any]) -> Callable[..., Any]:
@@ -52,9 +93,89 @@ def admin_required(view: Callable[..., Any]) -> Callable[..., Any]:
     return wrapped
 
 
+def view_cache_key() -> str:
+    # Keyed on the data version so any write, including one made outside this
+    # process, moves readers onto fresh entries; stale ones expire by timeout.
+    return f"view{request.path}/{snapshot_version()}/"
+
+
+def has_session() -> bool:
+    # Signed-in viewers and pending flash messages get personalised pages.
+    return bool(session)
+
+
+def cached_view(view: Callable[..., Any]) -> Callable[..., Any]:
+    return cache.cached(
+        timeout=VIEW_CACHE_TIMEOUT,
+        key_prefix=view_cache_key,
+        query_string=True,
+        unless=has_session,
+    )(view)
+
+
+def conditional_get(per_viewer: bool) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # ETag the response with the data version (and viewer, when the payload is
+    # permission-aware) so repeat requests get a 304 without re-serializing.
+    def decorator(view: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(view)
+        def wrapped(*args: Any, **kwargs: Any):
+            # Bound to the full URL so a validator from another resource or
+            # query never matches this one.
+            resource = hashlib.blake2b(request.full_path.encode("utf-8"), digest_size=8).hexdigest()
+            etag = f"{snapshot_version()}-{resource}"
+            if per_viewer:
+                viewer = current_user()
+                etag = f"{etag}-{viewer['id'] if viewer else 'anonymous'}"
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.cache_control.max_age = API_MAX_AGE
+            if per_viewer:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    # orjson encodes straight to bytes, skipping Flask's JSON provider.
+    return current_app.response_class(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def stream_attendees(attendees: Iterator[tuple[dict[str, Any], dict[str, Any]]], limit: int) -> Response:
+    # Same payload as list_visible_attendees, encoded row by row so only the
+    # row being written is held in memory.
+    def generate() -> Iterator[bytes]:
+        yield b'{"items":['
+        shown = 0
+        for row, user in islice(attendees, limit):
+            yield (b"," if shown else b"") + orjson.dumps(attendee_item(row, user))
+            shown += 1
+        total_visible = shown + sum(1 for _ in attendees)
+        yield b'],"total_visible":%d,"limit":%d}' % (total_visible, limit)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/json")
+
+
 def format_iso(value: str | None) -> str:
     if not value:
         return "Unknown"
+    return _format_iso_cached(value)
+
+
+@lru_cache(maxsize=4096)
+def _format_iso_cached(value: str) -> str:
+    # Event and attendance timestamps repeat across renders; parse each once.
     try:
         parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
     except ValueError:
@@ -62,18 +183,27 @@ def format_iso(value: str | None) -> str:
     return parsed.strftime("%b %d, %Y %H:%M UTC")
 
 
-def create_app() -> Flask:
+@lru_cache(maxsize=1)
+def load_env() -> None:
     load_dotenv()
+
+
+def create_app() -> Flask:
+    load_env()
     app = Flask(__name__, template_folder="../templates", static_folder="../static")
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "change-me")
+    app.config.setdefault("CACHE_TYPE", os.getenv("CACHE_TYPE", "SimpleCache"))
+    app.config.setdefault("CACHE_DEFAULT_TIMEOUT", VIEW_CACHE_TIMEOUT)
+    cache.init_app(app)
 
     @app.context_processor
     def inject_user() -> dict[str, Any]:
         return {"viewer": current_user(), "format_iso": format_iso}
 
     @app.get("/")
+    @cached_view
     def home() -> str:
-        events = search_events()
+        events = search_events(data=data_snapshot())
         return render_template("home.html", events=events[:8])
 
     @app.route("/login", methods=["GET", "POST"])
@@ -85,12 +215,13 @@ def create_app() -> Flask:
         password = request.form.get("password", "")
         expected_password = os.getenv("AUTH_CREDENTIALS_SEED_PASSWORD", "devpassword")
 
-        user = get_user_by_email(email)
+        user = get_user_by_email(email, data=data_snapshot())
         if not user or password != expected_password:
             flash("Invalid credentials")
             return render_template("login.html", next_path=request.form.get("next", "")), 401
 
         session["user_id"] = user["id"]
+        g.pop("user", None)
         flash(f"Signed in as {user['email']}")
         next_path = request.form.get("next", "")
         return redirect(next_path or url_for("events"))
@@ -98,26 +229,28 @@ def create_app() -> Flask:
     @app.post("/logout")
     def logout():
         session.clear()
+        g.pop("user", None)
         flash("Signed out")
         return redirect(url_for("home"))
 
     @app.get("/events")
+    @cached_view
     def events() -> str:
         query = request.args.get("query")
         city = request.args.get("city")
-        events_list = search_events(query=query, city=city)
+        events_list = search_events(query=query, city=city, data=data_snapshot())
         return render_template("events.html", events=events_list, query=query or "", city=city or "")
 
     @app.get("/events/<slug>")
     def event_details(slug: str):
-        event = get_event_by_slug(slug)
+        event = get_event_by_slug(slug, data=data_snapshot())
         if event is None:
             return render_template("not_found.html"), 404
 
         viewer = current_user()
         existing_attendance = None
         if viewer:
-            existing_attendance = get_attendance_for_user(slug, str(viewer["id"]))
+            existing_attendance = get_attendance_for_user(slug, str(viewer["id"]), data=data_snapshot())
 
         attendees = list_visible_attendees(
             slug,
@@ -125,6 +258,7 @@ def create_app() -> Flask:
             company=request.args.get("company"),
             title=request.args.get("title"),
             state=request.args.get("state"),
+            data=data_snapshot(),
         )
         return render_template(
             "event_detail.html",
@@ -153,7 +287,7 @@ def create_app() -> Flask:
     @app.get("/admin/events")
     @admin_required
     def admin_events() -> str:
-        return render_template("admin_events.html", events=search_events())
+        return render_template("admin_events.html", events=search_events(data=data_snapshot()))
 
     @app.route("/admin/events/new", methods=["GET", "POST"])
     @admin_required
@@ -184,7 +318,7 @@ def create_app() -> Flask:
     @app.route("/admin/events/<slug>/edit", methods=["GET", "POST"])
     @admin_required
     def admin_events_edit(slug: str):
-        event = get_event_by_slug(slug)
+        event = get_event_by_slug(slug, data=data_snapshot())
         if not event:
             return render_template("not_found.html"), 404
 
@@ -230,48 +364,62 @@ def create_app() -> Flask:
         return render_template("me.html", user=user)
 
     @app.get("/api/events")
+    @conditional_get(per_viewer=False)
+    @cached_view
     def api_events():
         query = request.args.get("query")
         city = request.args.get("city")
-        return jsonify({"items": search_events(query=query, city=city)})
+        return json_response({"items": search_events(query=query, city=city, data=data_snapshot())})
 
     @app.get("/api/events/<slug>")
+    @conditional_get(per_viewer=True)
+    @cached_view
     def api_event(slug: str):
-        event = get_event_by_slug(slug)
+        event = get_event_by_slug(slug, data=data_snapshot())
         if event is None:
-            return jsonify({"error": "Event not found"}), 404
+            return json_response({"error": "Event not found"}, 404)
         attendees = list_visible_attendees(
             slug,
             current_user(),
             company=request.args.get("company"),
             title=request.args.get("title"),
             state=request.args.get("state"),
+            data=data_snapshot(),
         )
-        payload = dict(event)
-        payload["attendees"] = attendees
-        return jsonify(payload)
+        return json_response({**event, "attendees": attendees})
 
     @app.get("/api/events/<slug>/attendees")
+    @conditional_get(per_viewer=True)
     def api_event_attendees(slug: str):
-        event = get_event_by_slug(slug)
+        event = get_event_by_slug(slug, data=data_snapshot())
         if event is None:
-            return jsonify({"error": "Event not found"}), 404
-        return jsonify(
-            list_visible_attendees(
-                slug,
-                current_user(),
-                company=request.args.get("company"),
-                title=request.args.get("title"),
-                state=request.args.get("state"),
-            )
+            return json_response({"error": "Event not found"}, 404)
+        viewer = current_user()
+        attendees = iter_visible_attendees(
+            slug,
+            viewer,
+            company=request.args.get("company"),
+            title=request.args.get("title"),
+            state=request.args.get("state"),
+            data=data_snapshot(),
         )
+        return stream_attendees(attendees, attendee_limit(viewer))
 
     return app
 
 
-app = create_app()
+@lru_cache(maxsize=1)
+def get_app() -> Flask:
+    return create_app()
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `src.app:app` working for WSGI servers without building the app on import.
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5000"))
-    app.run(host="127.0.0.1", port=port, debug=os.getenv("FLASK_ENV") == "development")
+    get_app().run(host="127.0.0.1", port=port, debug=os.getenv("FLASK_ENV") == "development")
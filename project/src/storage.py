@@ -1,13 +1,58 @@
 from __future__ import annotations
 
-import json
+import re
+import sqlite3
+import threading
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator, NamedTuple
+
+import orjson
 
 DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "events.json"
 FREE_ATTENDEE_LIMIT = 25
 PRO_ATTENDEE_LIMIT = 500
+# Attendance upserts are appended to a JSON-lines log next to DATA_FILE and
+# folded back into it once the log grows past this many bytes.
+ATTENDANCE_LOG_COMPACT_BYTES = 64 * 1024
+# Capability bits a viewer needs to see an attendance row; admins hold them all.
+_CAP_VERIFIED = 1
+_CAP_PRIVATE = 2
+_CAP_UNKNOWN = 4
+_CAP_ALL = ~0
+_VISIBILITY_CAPS = {"PUBLIC": 0, "VERIFIED_ONLY": _CAP_VERIFIED, "PRIVATE": _CAP_PRIVATE}
+# Runs of anything str.isalnum() rejects (\W plus underscore).
+_SLUG_SEPARATORS = re.compile(r"[\W_]+")
+
+
+class _SearchRow(NamedTuple):
+    name: str
+    description: str
+    city: str
+
+
+class _Indexes(NamedTuple):
+    users_by_id: dict[str, dict[str, Any]]
+    users_by_email: dict[str, dict[str, Any]]
+    events_by_slug: dict[str, dict[str, Any]]
+    attendances_by_key: dict[tuple[str, str], dict[str, Any]]
+    attendances_by_slug: dict[str, list[tuple[int, dict[str, Any]]]]
+    events_sorted: list[dict[str, Any]]
+    search_rows: list[_SearchRow]
+
+
+# Parsed contents of DATA_FILE (plus its attendance log) and their lookup
+# indexes, keyed by path, st_mtime_ns and st_size of both files so repeated
+# reads of unchanged files skip the I/O, the JSON parse and the index build.
+_CACHE: tuple[tuple[str, int, int, int, int], dict[str, Any], _Indexes] | None = None
+
+# In-memory SQLite mirror of the current search rows, built on the first
+# filtered search. The flag records whether FTS5 trigram is available.
+_SEARCH_DB: tuple[list[_SearchRow], sqlite3.Connection, bool] | None = None
+_SEARCH_DB_LOCK = threading.Lock()
+# The trigram tokenizer cannot match queries shorter than this.
+_TRIGRAM_MIN_QUERY = 3
 
 
 def now_iso() -> str:
@@ -24,63 +69,269 @@ def _default_data() -> dict[str, Any]:
     }
 
 
+def _attendance_log_file() -> Path:
+    return DATA_FILE.with_name(f"{DATA_FILE.stem}.attendances.jsonl")
+
+
+def _cache_key() -> tuple[str, int, int, int, int]:
+    stat = DATA_FILE.stat()
+    try:
+        log_stat = _attendance_log_file().stat()
+        log_mtime, log_size = log_stat.st_mtime_ns, log_stat.st_size
+    except FileNotFoundError:
+        log_mtime, log_size = 0, 0
+    return (str(DATA_FILE), stat.st_mtime_ns, stat.st_size, log_mtime, log_size)
+
+
+def _event_sort_key(event: dict[str, Any]) -> tuple[str, str]:
+    return (str(event.get("start_at", "")), str(event.get("slug", "")))
+
+
+def _attendance_sort_key(row: dict[str, Any]) -> tuple[str, str]:
+    return (str(row.get("updated_at", "")), str(row.get("user_id", "")))
+
+
+def _attendance_indexes(
+    data: dict[str, Any]
+) -> tuple[dict[tuple[str, str], dict[str, Any]], dict[str, list[tuple[int, dict[str, Any]]]]]:
+    attendances_by_key: dict[tuple[str, str], dict[str, Any]] = {}
+    attendances_by_slug: dict[str, list[tuple[int, dict[str, Any]]]] = {}
+    for row in data["attendances"]:
+        attendances_by_key.setdefault((row.get("event_slug"), row.get("user_id")), row)
+        required_caps = _VISIBILITY_CAPS.get(row.get("visibility"), _CAP_UNKNOWN)
+        attendances_by_slug.setdefault(row.get("event_slug"), []).append((required_caps, row))
+    # Newest first, the order list_visible_attendees reports them in.
+    for bucket in attendances_by_slug.values():
+        bucket.sort(key=lambda item: _attendance_sort_key(item[1]), reverse=True)
+    return attendances_by_key, attendances_by_slug
+
+
+def _build_indexes(data: dict[str, Any]) -> _Indexes:
+    # setdefault keeps the first matching row, like the linear scans did.
+    users_by_id: dict[str, dict[str, Any]] = {}
+    users_by_email: dict[str, dict[str, Any]] = {}
+    for user in data["users"]:
+        users_by_id.setdefault(str(user.get("id")), user)
+        users_by_email.setdefault(str(user.get("email", "")).lower(), user)
+
+    events_by_slug: dict[str, dict[str, Any]] = {}
+    for event in data["events"]:
+        events_by_slug.setdefault(str(event.get("slug")), event)
+
+    attendances_by_key, attendances_by_slug = _attendance_indexes(data)
+
+    # Sorted and lowercased once per load so searches neither re-lowercase
+    # every event nor re-sort their results.
+    events_sorted = sorted(data["events"], key=_event_sort_key)
+    search_rows = [
+        _SearchRow(
+            str(event.get("name", "")).lower(),
+            str(event.get("description", "")).lower(),
+            str(event.get("city", "")).lower(),
+        )
+        for event in events_sorted
+    ]
+
+    return _Indexes(
+        users_by_id,
+        users_by_email,
+        events_by_slug,
+        attendances_by_key,
+        attendances_by_slug,
+        events_sorted,
+        search_rows,
+    )
+
+
+def _indexes(data: dict[str, Any] | None = None) -> _Indexes:
+    if data is None:
+        data = read_data()
+    if _CACHE is not None and _CACHE[1] is data:
+        return _CACHE[2]
+    return _build_indexes(data)
+
+
 def read_data() -> dict[str, Any]:
-    if not DATA_FILE.exists():
-        return _default_data()
-    with DATA_FILE.open("r", encoding="utf-8") as handle:
-        payload = json.load(handle)
+    # The returned dict is shared between callers; mutations must be persisted
+    # with write_data, which refreshes the cache.
+    return _load()[0]
+
+
+def read_versioned_data() -> tuple[dict[str, Any], str]:
+    # The data together with an opaque token for exactly that load; the token
+    # changes whenever the data file or attendance log does.
+    data, key = _load()
+    if key is None:
+        return data, "empty"
+    return data, "-".join(f"{part:x}" for part in key[1:])
+
+
+def _load() -> tuple[dict[str, Any], tuple[str, int, int, int, int] | None]:
+    global _CACHE
+    try:
+        key = _cache_key()
+    except FileNotFoundError:
+        _CACHE = None
+        return _default_data(), None
+    cached = _CACHE
+    if cached is not None and cached[0] == key:
+        return cached[1], key
+
+    payload = orjson.loads(DATA_FILE.read_bytes())
     if not isinstance(payload, dict):
-        return _default_data()
+        return _default_data(), None
 
     data = _default_data()
-    for key in data:
-        value = payload.get(key, data[key])
-        data[key] = value if isinstance(value, list) else data[key]
-    return data
+    for key_name in data:
+        value = payload.get(key_name, data[key_name])
+        data[key_name] = value if isinstance(value, list) else data[key_name]
+    _replay_attendance_log(data)
+    _CACHE = (key, data, _build_indexes(data))
+    return data, key
+
+
+def _replay_attendance_log(data: dict[str, Any]) -> None:
+    log_file = _attendance_log_file()
+    if not log_file.exists():
+        return
+
+    rows = {(row.get("event_slug"), row.get("user_id")): row for row in data["attendances"]}
+    with log_file.open("rb") as handle:
+        for line in handle:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A torn trailing line from an interrupted append.
+                continue
+            if not isinstance(entry, dict):
+                continue
+            key = (entry.get("event_slug"), entry.get("user_id"))
+            existing = rows.get(key)
+            if existing is None:
+                rows[key] = entry
+                data["attendances"].append(entry)
+            else:
+                existing.update(entry)
 
 
 def write_data(data: dict[str, Any]) -> None:
-    DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with DATA_FILE.open("w", encoding="utf-8") as handle:
-        json.dump(data, handle, indent=2)
+    global _CACHE
+    try:
+        DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
+        DATA_FILE.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        # The full rewrite already contains every logged attendance.
+        _attendance_log_file().unlink(missing_ok=True)
+    except BaseException:
+        # Callers mutate the cached dict before writing; don't keep serving
+        # changes that never reached disk.
+        _CACHE = None
+        raise
+    _CACHE = (_cache_key(), data, _build_indexes(data))
+
+
+def _append_attendance(data: dict[str, Any], row: dict[str, Any]) -> None:
+    global _CACHE
+    log_file = _attendance_log_file()
+    try:
+        with log_file.open("ab") as handle:
+            handle.write(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+    except BaseException:
+        _CACHE = None
+        raise
+    if log_file.stat().st_size > ATTENDANCE_LOG_COMPACT_BYTES:
+        write_data(data)
+        return
+
+    # Only attendances changed: keep the user and event indexes (and with them
+    # the search mirror) and rebuild just the attendance ones.
+    cached = _CACHE
+    if cached is not None and cached[1] is data:
+        attendances_by_key, attendances_by_slug = _attendance_indexes(data)
+        indexes = cached[2]._replace(attendances_by_key=attendances_by_key, attendances_by_slug=attendances_by_slug)
+    else:
+        indexes = _build_indexes(data)
+    _CACHE = (_cache_key(), data, indexes)
 
 
 def read_events() -> list[dict[str, Any]]:
     return read_data()["events"]
 
 
-def search_events(query: str | None = None, city: str | None = None) -> list[dict[str, Any]]:
-    events = read_events()
+def search_events(
+    query: str | None = None,
+    city: str | None = None,
+    data: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
     q = (query or "").strip().lower()
     c = (city or "").strip().lower()
+    indexes = _indexes(data)
+    # Unfiltered searches share the presorted list; callers must not mutate it.
+    if not q and not c:
+        return indexes.events_sorted
+
+    # instr() keeps the exact substring semantics on the lowercased columns;
+    # the FTS5 trigram index narrows the candidates first when q is long enough.
+    clauses: list[str] = []
+    params: list[str] = []
+    with _SEARCH_DB_LOCK:
+        connection, has_fts = _search_db(indexes)
+        if q:
+            clauses.append("(instr(name, ?) OR instr(description, ?))")
+            params += [q, q]
+            # FTS5 query strings cannot carry NUL; instr() alone still matches exactly.
+            if has_fts and len(q) >= _TRIGRAM_MIN_QUERY and "\x00" not in q:
+                clauses.append("position IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)")
+                params.append('"' + q.replace('"', '""') + '"')
+        if c:
+            clauses.append("instr(city, ?)")
+            params.append(c)
+        positions = connection.execute(
+            f"SELECT position FROM events WHERE {' AND '.join(clauses)} ORDER BY position",
+            params,
+        ).fetchall()
+
+    events_sorted = indexes.events_sorted
+    return [events_sorted[position] for (position,) in positions]
+
+
+def _search_db(indexes: _Indexes) -> tuple[sqlite3.Connection, bool]:
+    # Rows are keyed by their position in events_sorted so matches map straight
+    # back to the shared event dicts. Callers hold _SEARCH_DB_LOCK.
+    global _SEARCH_DB
+    if _SEARCH_DB is not None:
+        if _SEARCH_DB[0] is indexes.search_rows:
+            return _SEARCH_DB[1], _SEARCH_DB[2]
+        _SEARCH_DB[1].close()
+        _SEARCH_DB = None
+
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.execute(
+        "CREATE TABLE events (position INTEGER PRIMARY KEY, name TEXT, description TEXT, city TEXT)"
+    )
+    connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", ((position, *row) for position, row in enumerate(indexes.search_rows)))
+    try:
+        connection.execute(
+            "CREATE VIRTUAL TABLE events_fts USING fts5("
+            "name, description, content='events', content_rowid='position', tokenize='trigram')"
+        )
+        connection.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+        has_fts = True
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 or older than 3.34; fall back to instr() scans.
+        has_fts = False
 
-    filtered: list[dict[str, Any]] = []
-    for event in events:
-        name = str(event.get("name", "")).lower()
-        description = str(event.get("description", "")).lower()
-        event_city = str(event.get("city", "")).lower()
-        if q and q not in name and q not in description:
-            continue
-        if c and c not in event_city:
-            continue
-        filtered.append(event)
-
-    filtered.sort(key=lambda e: (str(e.get("start_at", "")), str(e.get("slug", ""))))
-    return filtered
+    _SEARCH_DB = (indexes.search_rows, connection, has_fts)
+    return connection, has_fts
 
 
-def get_event_by_slug(slug: str) -> dict[str, Any] | None:
-    for event in read_events():
-        if str(event.get("slug")) == slug:
-            return event
-    return None
+def get_event_by_slug(slug: str, data: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    return _indexes(data).events_by_slug.get(slug)
 
 
 def _slugify(value: str) -> str:
-    safe = "".join(char.lower() if char.isalnum() else "-" for char in value.strip())
-    while "--" in safe:
-        safe = safe.replace("--", "-")
-    return safe.strip("-")
+    # Lowercase per character after substituting, as the old char loop did;
+    # str.lower() on the whole string differs for final sigma and dotted I.
+    return "".join(map(str.lower, _SLUG_SEPARATORS.sub("-", value.strip()))).strip("-")
 
 
 def create_event(payload: dict[str, Any]) -> dict[str, Any]:
@@ -88,7 +339,7 @@ def create_event(payload: dict[str, Any]) -> dict[str, Any]:
     slug = _slugify(str(payload.get("slug") or payload.get("name") or ""))
     if not slug:
         raise ValueError("Slug or name is required")
-    if any(str(event.get("slug")) == slug for event in data["events"]):
+    if slug in _indexes(data).events_by_slug:
         raise ValueError("Event slug already exists")
 
     event = {
@@ -113,18 +364,13 @@ def create_event(payload: dict[str, Any]) -> dict[str, Any]:
 
 def update_event(slug: str, payload: dict[str, Any]) -> dict[str, Any]:
     data = read_data()
-    events = data["events"]
-    found: dict[str, Any] | None = None
-    for event in events:
-        if str(event.get("slug")) == slug:
-            found = event
-            break
-
+    events_by_slug = _indexes(data).events_by_slug
+    found = events_by_slug.get(slug)
     if found is None:
         raise ValueError("Event not found")
 
     new_slug = _slugify(str(payload.get("slug") or slug))
-    if new_slug != slug and any(str(event.get("slug")) == new_slug for event in events):
+    if new_slug != slug and new_slug in events_by_slug:
         raise ValueError("Event slug already exists")
 
     found.update(
@@ -150,32 +396,41 @@ def update_event(slug: str, payload: dict[str, Any]) -> dict[str, Any]:
     return found
 
 
+def _drop_rows(rows: list[dict[str, Any]], matches: Callable[[dict[str, Any]], bool]) -> None:
+    # Compacts in place instead of building a filtered copy of the table.
+    keep = 0
+    for row in rows:
+        if not matches(row):
+            rows[keep] = row
+            keep += 1
+    del rows[keep:]
+
+
 def delete_event(slug: str) -> None:
     data = read_data()
-    before = len(data["events"])
-    data["events"] = [event for event in data["events"] if str(event.get("slug")) != slug]
-    if len(data["events"]) == before:
+    indexes = _indexes(data)
+    if slug not in indexes.events_by_slug:
         raise ValueError("Event not found")
 
-    data["attendances"] = [a for a in data["attendances"] if a.get("event_slug") != slug]
-    data["side_events"] = [s for s in data["side_events"] if s.get("event_slug") != slug]
-    data["meeting_requests"] = [m for m in data["meeting_requests"] if m.get("event_slug") != slug]
+    def references_event(row: dict[str, Any]) -> bool:
+        return row.get("event_slug") == slug
+
+    # Every event with the slug goes, including duplicates in hand-edited files.
+    _drop_rows(data["events"], lambda event: str(event.get("slug")) == slug)
+    if slug in indexes.attendances_by_slug:
+        _drop_rows(data["attendances"], references_event)
+    for table in ("side_events", "meeting_requests"):
+        if any(references_event(row) for row in data[table]):
+            _drop_rows(data[table], references_event)
     write_data(data)
 
 
-def get_user_by_email(email: str) -> dict[str, Any] | None:
-    lookup = email.strip().lower()
-    for user in read_data()["users"]:
-        if str(user.get("email", "")).lower() == lookup:
-            return user
-    return None
+def get_user_by_email(email: str, data: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    return _indexes(data).users_by_email.get(email.strip().lower())
 
 
-def get_user_by_id(user_id: str) -> dict[str, Any] | None:
-    for user in read_data()["users"]:
-        if str(user.get("id")) == user_id:
-            return user
-    return None
+def get_user_by_id(user_id: str, data: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    return _indexes(data).users_by_id.get(user_id)
 
 
 def can_view_verified_only(viewer: dict[str, Any] | None) -> bool:
@@ -194,11 +449,12 @@ def attendee_limit(viewer: dict[str, Any] | None) -> int:
     return FREE_ATTENDEE_LIMIT
 
 
-def get_attendance_for_user(event_slug: str, user_id: str) -> dict[str, Any] | None:
-    for row in read_data()["attendances"]:
-        if row.get("event_slug") == event_slug and row.get("user_id") == user_id:
-            return row
-    return None
+def get_attendance_for_user(
+    event_slug: str,
+    user_id: str,
+    data: dict[str, Any] | None = None
+) -> dict[str, Any] | None:
+    return _indexes(data).attendances_by_key.get((event_slug, user_id))
 
 
 def upsert_attendance(event_slug: str, user_id: str, state: str, visibility: str) -> dict[str, Any]:
@@ -208,19 +464,16 @@ def upsert_attendance(event_slug: str, user_id: str, state: str, visibility: str
         raise ValueError("Invalid attendance visibility")
 
     data = read_data()
-    if not any(str(event.get("slug")) == event_slug for event in data["events"]):
+    indexes = _indexes(data)
+    if event_slug not in indexes.events_by_slug:
         raise ValueError("Event not found")
 
-    existing: dict[str, Any] | None = None
-    for row in data["attendances"]:
-        if row.get("event_slug") == event_slug and row.get("user_id") == user_id:
-            existing = row
-            break
+    existing = indexes.attendances_by_key.get((event_slug, user_id))
 
     now = now_iso()
     if existing:
         existing.update({"state": state, "visibility": visibility, "updated_at": now})
-        write_data(data)
+        _append_attendance(data, existing)
         return existing
 
     created = {
@@ -231,28 +484,40 @@ def upsert_attendance(event_slug: str, user_id: str, state: str, visibility: str
         "updated_at": now
     }
     data["attendances"].append(created)
-    write_data(data)
+    _append_attendance(data, created)
     return created
 
 
-def list_visible_attendees(
+def iter_visible_attendees(
     event_slug: str,
     viewer: dict[str, Any] | None,
     company: str | None = None,
     title: str | None = None,
-    state: str | None = None
-) -> dict[str, Any]:
-    data = read_data()
-    users = {str(user.get("id")): user for user in data["users"]}
-
-    rows = [a for a in data["attendances"] if a.get("event_slug") == event_slug]
-    rows.sort(key=lambda a: (str(a.get("updated_at", "")), str(a.get("user_id", ""))), reverse=True)
+    state: str | None = None,
+    data: dict[str, Any] | None = None
+) -> Iterator[tuple[dict[str, Any], dict[str, Any]]]:
+    # Yields (attendance, user) for every row the viewer may see, newest first.
+    # Callers apply attendee_limit and build payloads with attendee_item only for
+    # rows they return, so rows past the limit are merely counted.
+    indexes = _indexes(data)
+    users = indexes.users_by_id
+    rows = indexes.attendances_by_slug.get(event_slug, [])
 
     c = (company or "").strip().lower()
     t = (title or "").strip().lower()
 
-    visible: list[dict[str, Any]] = []
-    for row in rows:
+    if viewer and viewer.get("role") == "ADMIN":
+        viewer_caps = _CAP_ALL
+    else:
+        viewer_caps = _CAP_VERIFIED if can_view_verified_only(viewer) else 0
+    viewer_id = viewer.get("id") if viewer else None
+
+    for required_caps, row in rows:
+        # Private rows are also visible to the attendee themselves.
+        if required_caps & ~viewer_caps and not (
+            required_caps == _CAP_PRIVATE and viewer and viewer_id == row.get("user_id")
+        ):
+            continue
         if state and row.get("state") != state:
             continue
 
@@ -260,42 +525,40 @@ def list_visible_attendees(
         if not user:
             continue
 
-        visibility = row.get("visibility")
-        can_see = False
-        if viewer and viewer.get("role") == "ADMIN":
-            can_see = True
-        elif visibility == "PUBLIC":
-            can_see = True
-        elif visibility == "VERIFIED_ONLY":
-            can_see = can_view_verified_only(viewer)
-        elif visibility == "PRIVATE":
-            can_see = bool(viewer and viewer.get("id") == row.get("user_id"))
-
-        if not can_see:
-            continue
-
         if c and c not in str(user.get("company", "")).lower():
             continue
         if t and t not in str(user.get("title", "")).lower():
             continue
 
-        visible.append(
-            {
-                "user_id": user.get("id"),
-                "name": user.get("name"),
-                "email": user.get("email"),
-                "company": user.get("company", ""),
-                "title": user.get("title", ""),
-                "state": row.get("state"),
-                "visibility": visibility,
-                "updated_at": row.get("updated_at")
-            }
-        )
+        yield row, user
+
+
+def attendee_item(row: dict[str, Any], user: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "user_id": user.get("id"),
+        "name": user.get("name"),
+        "email": user.get("email"),
+        "company": user.get("company", ""),
+        "title": user.get("title", ""),
+        "state": row.get("state"),
+        "visibility": row.get("visibility"),
+        "updated_at": row.get("updated_at")
+    }
+
 
+def list_visible_attendees(
+    event_slug: str,
+    viewer: dict[str, Any] | None,
+    company: str | None = None,
+    title: str | None = None,
+    state: str | None = None,
+    data: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    attendees = iter_visible_attendees(event_slug, viewer, company=company, title=title, state=state, data=data)
     limit = attendee_limit(viewer)
-    limited = visible[:limit]
+    visible = [attendee_item(row, user) for row, user in islice(attendees, limit)]
     return {
-        "items": limited,
-        "total_visible": len(visible),
+        "items": visible,
+        "total_visible": len(visible) + sum(1 for _ in attendees),
         "limit": limit
     }
@@ -3,10 +3,19 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+import pytest
+
 import src.storage as storage
 from src.app import create_app
 
 
+@pytest.fixture(autouse=True)
+def _restore_storage(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Tests point storage at their own data file; undo that (and the read cache) afterwards.
+    monkeypatch.setattr(storage, "DATA_FILE", storage.DATA_FILE)
+    monkeypatch.setattr(storage, "_CACHE", None)
+
+
 def _write_seed(path: Path) -> None:
     payload = {
         "events": [
@@ -153,3 +162,246 @@ def test_admin_can_create_edit_delete_event(tmp_path: Path) -> None:
     deleted = client.post("/admin/events/new-event/delete", follow_redirects=True)
     assert deleted.status_code == 200
     assert b"Event deleted" in deleted.data
+
+
+def test_read_data_reloads_after_external_edit(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    assert storage.read_data() is storage.read_data()
+
+    payload = json.loads(data_file.read_text(encoding="utf-8"))
+    payload["events"][0]["name"] = "Event A Renamed"
+    data_file.write_text(json.dumps(payload), encoding="utf-8")
+    assert storage.read_data()["events"][0]["name"] == "Event A Renamed"
+
+
+def test_attendance_upserts_append_to_log_until_compacted(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    log_file = tmp_path / "events.attendances.jsonl"
+    seeded = data_file.read_text(encoding="utf-8")
+
+    storage.upsert_attendance("event-a", "admin", "ATTENDING", "PRIVATE")
+    storage.upsert_attendance("event-a", "free", "ATTENDING", "PUBLIC")
+    assert data_file.read_text(encoding="utf-8") == seeded
+    assert len(log_file.read_text(encoding="utf-8").splitlines()) == 2
+
+    storage._CACHE = None
+    assert storage.get_attendance_for_user("event-a", "admin")["visibility"] == "PRIVATE"
+    assert storage.get_attendance_for_user("event-a", "free")["state"] == "ATTENDING"
+
+    storage.write_data(storage.read_data())
+    assert not log_file.exists()
+    rows = json.loads(data_file.read_text(encoding="utf-8"))["attendances"]
+    assert len(rows) == 3
+
+
+def test_api_events_honors_if_none_match(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    first = client.get("/api/events")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    cached = client.get("/api/events", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    # Proxies that re-encode the body (e.g. gzip) weaken the validator.
+    weakened = client.get("/api/events", headers={"If-None-Match": f"W/{etag}"})
+    assert weakened.status_code == 304
+
+    storage.create_event({"name": "Event B", "start_at": "2026-05-01T09:00:00Z"})
+    refreshed = client.get("/api/events", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert len(refreshed.get_json()["items"]) == 2
+
+
+def test_delete_event_drops_its_attendances(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    storage.create_event({"name": "Event B", "start_at": "2026-05-01T09:00:00Z"})
+    storage.upsert_attendance("event-b", "free", "INTERESTED", "PUBLIC")
+
+    storage.delete_event("event-a")
+    data = storage.read_data()
+    assert [event["slug"] for event in data["events"]] == ["event-b"]
+    assert [row["event_slug"] for row in data["attendances"]] == ["event-b"]
+    assert storage.get_event_by_slug("event-a") is None
+
+
+def test_delete_event_removes_duplicate_slugs(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    payload = json.loads(data_file.read_text(encoding="utf-8"))
+    payload["events"].append(dict(payload["events"][0], name="Event A (copy)"))
+    data_file.write_text(json.dumps(payload), encoding="utf-8")
+    storage.DATA_FILE = data_file
+
+    storage.delete_event("event-a")
+    assert storage.read_data()["events"] == []
+    assert storage.get_event_by_slug("event-a") is None
+
+
+def test_slugify_collapses_separator_runs() -> None:
+    assert storage._slugify("  Money20/20 -- USA__2026! ") == "money20-20-usa-2026"
+    assert storage._slugify("Café Zürich") == "café-zürich"
+    assert storage._slugify("---") == ""
+    # Lowercased per character, so no final-sigma or dotted-I context rules.
+    assert storage._slugify("ΑΘΗΝΑΣ 2026") == "αθηνασ-2026"
+    assert storage._slugify("İstanbul Fintech") == "i\u0307stanbul-fintech"
+
+
+def test_list_visible_attendees_newest_first_within_limit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    admin = storage.get_user_by_id("admin")
+
+    listing = storage.list_visible_attendees("event-a", admin)
+    assert [item["user_id"] for item in listing["items"]] == ["verified", "free"]
+
+    monkeypatch.setattr(storage, "PRO_ATTENDEE_LIMIT", 1)
+    listing = storage.list_visible_attendees("event-a", admin)
+    assert [item["user_id"] for item in listing["items"]] == ["verified"]
+    assert listing["total_visible"] == 2
+    assert listing["limit"] == 1
+
+    built: list[str] = []
+    build_item = storage.attendee_item
+    monkeypatch.setattr(storage, "attendee_item", lambda row, user: built.append(user["id"]) or build_item(row, user))
+    storage.list_visible_attendees("event-a", admin)
+    assert built == ["verified"]
+
+
+def test_api_event_attendees_streams_visible_rows(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    anonymous = client.get("/api/events/event-a/attendees").get_json()
+    assert anonymous == {
+        "items": [
+            {
+                "user_id": "free",
+                "name": "Free User",
+                "email": "free@local.dev",
+                "company": "Indie",
+                "title": "Consultant",
+                "state": "INTERESTED",
+                "visibility": "PUBLIC",
+                "updated_at": "2026-02-08T12:00:00Z"
+            }
+        ],
+        "total_visible": 1,
+        "limit": storage.FREE_ATTENDEE_LIMIT
+    }
+
+    client.post("/login", data={"email": "admin@local.dev", "password": "devpassword"})
+    admin = client.get("/api/events/event-a/attendees").get_json()
+    assert [item["user_id"] for item in admin["items"]] == ["verified", "free"]
+    assert admin["total_visible"] == 2
+
+
+def test_api_events_filters_by_query_and_city(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    storage.create_event({"name": "Payments Summit", "description": "Card rails", "city": "London"})
+
+    def slugs(query_string: str) -> list[str]:
+        return [item["slug"] for item in client.get(f"/api/events?{query_string}").get_json()["items"]]
+
+    assert slugs("query=payments") == ["payments-summit"]
+    assert slugs("query=EVENT") == ["event-a"]
+    assert slugs("query=t&city=vegas") == ["event-a"]
+    assert slugs("city=lond") == ["payments-summit"]
+    assert slugs("query=missing") == []
+
+
+def test_search_with_nul_byte_returns_no_matches(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    api = client.get("/api/events?query=event%00")
+    assert api.status_code == 200
+    assert api.get_json()["items"] == []
+    assert client.get("/events?query=event%00").status_code == 200
+
+
+def test_attendance_upsert_keeps_the_search_mirror(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    assert [event["slug"] for event in storage.search_events("event")] == ["event-a"]
+    mirror = storage._SEARCH_DB
+
+    storage.upsert_attendance("event-a", "admin", "ATTENDING", "PUBLIC")
+    assert [event["slug"] for event in storage.search_events("event")] == ["event-a"]
+    assert storage._SEARCH_DB is mirror
+
+
+def test_failed_write_does_not_leave_unsaved_changes_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+
+    def fail(*args: object, **kwargs: object) -> bytes:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage.orjson, "dumps", fail)
+    with pytest.raises(OSError):
+        storage.update_event("event-a", {"name": "Unsaved"})
+    assert storage.get_event_by_slug("event-a")["name"] == "Event A"
+
+    with pytest.raises(OSError):
+        storage.upsert_attendance("event-a", "free", "ATTENDING", "PRIVATE")
+    assert storage.get_attendance_for_user("event-a", "free")["visibility"] == "PUBLIC"
+
+
+def test_etag_from_one_resource_does_not_match_another(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    etag = client.get("/api/events/event-a").headers["ETag"]
+    assert client.get("/api/events/event-a", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/events/missing", headers={"If-None-Match": etag}).status_code == 404
+    assert client.get("/api/events/event-a?state=ATTENDING", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_data_version_follows_the_file_not_the_cached_object(tmp_path: Path) -> None:
+    data_file = tmp_path / "events.json"
+    _write_seed(data_file)
+    storage.DATA_FILE = data_file
+    data, version = storage.read_versioned_data()
+
+    storage._CACHE = None
+    reloaded, reloaded_version = storage.read_versioned_data()
+    assert reloaded is not data
+    assert reloaded_version == version
+
+    storage.create_event({"name": "Event B"})
+    assert storage.read_versioned_data()[1] != version
+
+
+def test_anonymous_views_are_cached_until_data_changes(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    assert client.get("/api/events").get_json()["items"][0]["name"] == "Event A"
+
+    # An in-memory change without a write is invisible while the cached page lives.
+    storage.read_data()["events"][0]["name"] = "Not Persisted"
+    assert client.get("/api/events").get_json()["items"][0]["name"] == "Event A"
+
+    storage.create_event({"name": "Event B", "start_at": "2026-05-01T09:00:00Z"})
+    assert [item["slug"] for item in client.get("/api/events").get_json()["items"]] == ["event-a", "event-b"]
+
+
+def test_signed_in_viewer_never_gets_the_anonymous_cached_payload(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    anonymous = client.get("/api/events/event-a").get_json()
+    assert [item["user_id"] for item in anonymous["attendees"]["items"]] == ["free"]
+
+    client.post("/login", data={"email": "admin@local.dev", "password": "devpassword"})
+    admin = client.get("/api/events/event-a").get_json()
+    assert [item["user_id"] for item in admin["attendees"]["items"]] == ["verified", "free"]
+
+
+def test_pending_flash_bypasses_the_page_cache(tmp_path: Path) -> None:
+    client = _test_client(tmp_path)
+    assert b"Signed out" not in client.get("/").data
+
+    signed_out = client.post("/logout", follow_redirects=True)
+    assert b"Signed out" in signed_out.data